@@ -1,5 +1,5 @@
 import os
-import json
+import orjson
 from dotenv import load_dotenv
 from typing import Dict, Any
 
@@ -9,13 +9,18 @@ _here = os.path.dirname(__file__)
 
 def _load_json(fname: str) -> Dict[str, Any]:
     p = os.path.join(_here, fname)
-    with open(p, "r") as f:
-        return json.load(f)
+    with open(p, "rb") as f:
+        return orjson.loads(f.read())
 
 ZONES = _load_json("zones.json")
 AQI_BREAKPOINTS = _load_json("aqi_breakpoints.json")
 airgradient_token = os.getenv("AIRGRADIENT_TOKEN")
 jammu_airgradient_token = os.getenv("JAMMU_AIRGRADIENT_TOKEN")
+redis_url = os.getenv("REDIS_URL")
+update_concurrency = int(os.getenv("UPDATE_CONCURRENCY", "8"))
+# unset keeps every sensor reading; set to prune readings older than this many hours
+_retention = os.getenv("SENSOR_RETENTION_HOURS")
+sensor_retention_hours = int(_retention) if _retention else None
 
 SRINAGAR_AIRGRADIENT_CONFIG = {
     "location_id": 172681
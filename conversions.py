@@ -1,32 +1,48 @@
 import math
-from typing import Dict, Any, Optional, Tuple, Union
+from bisect import bisect_right
+from typing import Dict, Any, Final, List, Optional, Tuple, Union
 from config import AQI_BREAKPOINTS
 
-def linear_interpolate(c: float, bp: Tuple[float, float, int, int]) -> int:
-    c_lo, c_hi, i_lo, i_hi = bp
-    if c_hi == c_lo:
-        return i_lo
-    val = ((i_hi - i_lo) / (c_hi - c_lo)) * (c - c_lo) + i_lo
-    return int(val)
+def _build_table(bps) -> Tuple[Tuple[float, ...], ...]:
+    # columns (c_lo, c_hi, i_lo, slope); slope is 0 for a zero-width row so it yields i_lo
+    c_lo = tuple(float(row[0]) for row in bps)
+    c_hi = tuple(float(row[1]) for row in bps)
+    i_lo = tuple(row[2] for row in bps)
+    slope = tuple(
+        (i_hi - il) / (ch - cl) if ch != cl else 0.0
+        for cl, ch, il, i_hi in bps
+    )
+    return c_lo, c_hi, i_lo, slope
+
+# aliases -> canonical key; never mutated, so every call shares the one dict
+_KEY_MAP: Final[Dict[str, str]] = {
+    "pm2.5": "pm2_5", "pm2_5": "pm2_5", "pm25": "pm2_5",
+    "pm10": "pm10",
+    "co": "co", "carbon_monoxide": "co",
+    "no2": "no2", "nitrogen_dioxide": "no2",
+    "so2": "so2", "sulphur_dioxide": "so2",
+    "o3": "o3", "ozone": "o3"
+}
+
+# breakpoint columns per pollutant, built once at import
+_BP_TABLES = {p: _build_table(bps) for p, bps in AQI_BREAKPOINTS.items()}
 
 def get_single_pollutant_aqi(pollutant: str, conc: float) -> Optional[int]:
-    if pollutant not in AQI_BREAKPOINTS:
+    table = _BP_TABLES.get(pollutant)
+    if table is None:
         return None
+    return _sub_index(table, conc)
 
-    bps = AQI_BREAKPOINTS[pollutant]
-    
-    if conc < bps[0][0]:
+def _sub_index(table: Tuple[Tuple[float, ...], ...], conc: float) -> int:
+    c_lo, c_hi, i_lo, slope = table
+    if conc < c_lo[0]:
         return 0
 
-    for c_low, c_high, i_low, i_high in bps:
-        if c_low <= conc <= c_high:
-            return linear_interpolate(conc, (c_low, c_high, i_low, i_high))
-
-    last_bp = bps[-1]
-    if conc > last_bp[1]:
-        return 500
-
-    return None
+    k = bisect_right(c_lo, conc) - 1
+    # values in the rounding gap between rows (or past the last row) take the row's upper bound
+    if conc > c_hi[k]:
+        conc = c_hi[k]
+    return int(slope[k] * (conc - c_lo[k]) + i_lo[k])
 
 def prepare_for_indian_aqi(pollutant: str, val_ugm3: float) -> float:
     if pollutant == "co":
@@ -37,21 +53,12 @@ def calculate_overall_aqi(pollutants_ugm3: Dict[str, float], zone_type: str = "d
     aqi_details = {}
     concentrations_formatted = {}
 
-    key_map = {
-        "pm2.5": "pm2_5", "pm2_5": "pm2_5", "pm25": "pm2_5",
-        "pm10": "pm10",
-        "co": "co", "carbon_monoxide": "co",
-        "no2": "no2", "nitrogen_dioxide": "no2",
-        "so2": "so2", "sulphur_dioxide": "so2",
-        "o3": "o3", "ozone": "o3"
-    }
-
     for raw_key, val in pollutants_ugm3.items():
-        k = raw_key.lower().strip()
-        if k not in key_map:
+        # fetchers already pass canonical keys, so try the raw key before normalizing
+        internal_key = _KEY_MAP.get(raw_key) or _KEY_MAP.get(raw_key.lower().strip())
+        if internal_key is None:
             continue
-    
-        internal_key = key_map[k]
+
         indian_unit_val = prepare_for_indian_aqi(internal_key, val)
 
         concentrations_formatted[internal_key] = round(indian_unit_val, 2)
@@ -74,4 +81,23 @@ def calculate_overall_aqi(pollutants_ugm3: Dict[str, float], zone_type: str = "d
         "concentrations_us_units": concentrations_formatted,
         "concentrations_raw_ugm3": pollutants_ugm3,
         "zone_applied": zone_type
-    }
\ No newline at end of file
+    }
+
+def calculate_overall_aqi_batch(series_ugm3: Dict[str, List[Optional[float]]]) -> List[Optional[int]]:
+    # series_ugm3 maps canonical pollutant keys to equal-length hourly series (None = missing);
+    # hours with no usable pollutant at all come back as None
+    n = max((len(v) for v in series_ugm3.values()), default=0)
+    overall = [None] * n
+
+    for p, vals in series_ugm3.items():
+        table = _BP_TABLES.get(p)
+        if table is None:
+            continue
+        for i, val in enumerate(vals):
+            if val is None:
+                continue
+            sub = _sub_index(table, prepare_for_indian_aqi(p, val))
+            if overall[i] is None or sub > overall[i]:
+                overall[i] = sub
+
+    return overall
\ No newline at end of file
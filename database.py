@@ -1,52 +1,86 @@
 import sqlite3
+import threading
 import time
 import os
 
+from config import sensor_retention_hours
+
 DB_FILE = os.path.join(os.path.dirname(__file__), "breathe.db")
 
+_CONN = None
+_LOCK = threading.Lock() # callers run on worker threads; sqlite wants one writer at a time
+
 def get_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    # one long-lived connection instead of reopening the file on every read/write
+    global _CONN
+    if _CONN is None:
+        _CONN = sqlite3.connect(DB_FILE, check_same_thread=False)
+        _CONN.row_factory = sqlite3.Row
+    return _CONN
 
 def init_db():
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sensor_readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            zone_id TEXT NOT NULL,
-            timestamp REAL NOT NULL,
-            pm2_5 REAL,
-            pm10 REAL
-        )
-    ''')
-    c.execute('CREATE INDEX IF NOT EXISTS idx_zone_time ON sensor_readings (zone_id, timestamp)')
-    conn.commit()
-    conn.close()
+    with _LOCK:
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS sensor_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                zone_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                pm2_5 REAL,
+                pm10 REAL
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_zone_time ON sensor_readings (zone_id, timestamp)')
+        conn.commit()
 
 def save_reading(zone_id, pm25, pm10):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO sensor_readings (zone_id, timestamp, pm2_5, pm10)
-        VALUES (?, ?, ?, ?)
-    ''', (zone_id, time.time(), pm25, pm10))
-    conn.commit()
-    conn.close()
+    with _LOCK:
+        conn = get_connection()
+        now = time.time()
+        # commits on success, rolls back on error so a failed insert can't leave
+        # the shared connection sitting in a half-open transaction
+        with conn:
+            conn.execute('''
+                INSERT INTO sensor_readings (zone_id, timestamp, pm2_5, pm10)
+                VALUES (?, ?, ?, ?)
+            ''', (zone_id, now, pm25, pm10))
+            if sensor_retention_hours:
+                # opt-in trim; idx_zone_time turns this into a range seek, not a table scan
+                conn.execute('''
+                    DELETE FROM sensor_readings
+                    WHERE zone_id = ? AND timestamp < ?
+                ''', (zone_id, now - (sensor_retention_hours * 3600)))
 
 def get_history(zone_id, hours=24):
-    conn = get_connection()
-    c = conn.cursor()
-    cutoff = time.time() - (hours * 3600)
-    c.execute('''
-        SELECT timestamp as ts, pm2_5, pm10 
-        FROM sensor_readings 
-        WHERE zone_id = ? AND timestamp > ?
-        ORDER BY timestamp ASC
-    ''', (zone_id, cutoff))
-    rows = c.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    with _LOCK:
+        conn = get_connection()
+        c = conn.cursor()
+        cutoff = time.time() - (hours * 3600)
+        c.execute('''
+            SELECT timestamp as ts, pm2_5, pm10 
+            FROM sensor_readings 
+            WHERE zone_id = ? AND timestamp > ?
+            ORDER BY timestamp ASC
+        ''', (zone_id, cutoff))
+        rows = c.fetchall()
+        # parallel columns rather than a dict per row; callers only ever walk them in step
+        ts, pm2_5, pm10 = (list(col) for col in zip(*rows)) if rows else ([], [], [])
+        return {"ts": ts, "pm2_5": pm2_5, "pm10": pm10}
+
+def get_latest_reading(zone_id, hours=2):
+    with _LOCK:
+        conn = get_connection()
+        c = conn.cursor()
+        cutoff = time.time() - (hours * 3600)
+        c.execute('''
+            SELECT timestamp as ts, pm2_5, pm10
+            FROM sensor_readings
+            WHERE zone_id = ? AND timestamp > ?
+            ORDER BY timestamp DESC
+            LIMIT 1
+        ''', (zone_id, cutoff))
+        row = c.fetchone()
+        return dict(row) if row else None
 
 init_db()
\ No newline at end of file
@@ -1,387 +1,395 @@
 import httpx
+import orjson
 import asyncio
 import os
+import random
+import time
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 from fastapi import HTTPException
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
-from config import ZONES, SRINAGAR_AIRGRADIENT_CONFIG, JAMMU_AIRGRADIENT_CONFIG, airgradient_token, jammu_airgradient_token
-from conversions import calculate_overall_aqi
+import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from cachetools import TLRUCache
+
+from config import ZONES, SRINAGAR_AIRGRADIENT_CONFIG, JAMMU_AIRGRADIENT_CONFIG, airgradient_token, jammu_airgradient_token, redis_url, update_concurrency
+from conversions import calculate_overall_aqi, calculate_overall_aqi_batch
 import database
 
-_RAM_CACHE = {}
+# each entry lives until its own expires_unix, so adaptive expiry needs no manual checks
+_RAM_CACHE = TLRUCache(maxsize=max(64, len(ZONES)), ttu=lambda _k, v, _now: v["expires_unix"], timer=time.time)
+_STALE_CACHE: Dict[str, Dict[str, Any]] = {} # last known good payload, served when a refresh fails
+_INFLIGHT: Dict[str, asyncio.Task] = {}
+_OM_GASES_CACHE: Dict[Tuple[float, float], Tuple[int, Dict[str, Any]]] = {}
+_CLIENT: Optional[httpx.AsyncClient] = None
+# shared across workers when set; short timeouts and no retries so a dead Redis
+# costs at most half a second before falling back to the upstream fetch
+_REDIS = aioredis.from_url(
+    redis_url,
+    socket_connect_timeout=0.5,
+    socket_timeout=0.5,
+    retry=Retry(NoBackoff(), 0)
+) if redis_url else None
+_SHARED_KEY_PREFIX = "breathe:aqi:" # namespaced, in case the Redis instance is shared with other apps
 CACHE_DURATION = 900 # 15 minutes
-
-def _get_merged_history(zone_id: str, om_points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    local_data = database.get_history(zone_id, hours=24)
-    history_buckets = {}
-
+MIN_CACHE_DURATION = 300 # floor when upstream data looks stale
+CACHE_JITTER = 60 # spreads expiries so zones don't all refill together
+ZONE_START_SPREAD = 5 # seconds over which zone loops start, so startup isn't one burst
+_HISTORY_PARAMS = ["pm2_5", "pm10", "no2", "so2", "co", "o3"]
+_OM_URL = "https://air-quality-api.open-meteo.com/v1/air-quality"
+OM_HEDGE_AFTER = 1.5 # seconds before a slow Open-Meteo request gets a duplicate racing it
+
+# ground sensor zones: zone_id -> (location config, token, token env var)
+_AIRGRADIENT_ZONES = {
+    "srinagar": (SRINAGAR_AIRGRADIENT_CONFIG, airgradient_token, "AIRGRADIENT_TOKEN"),
+    "jammu_city": (JAMMU_AIRGRADIENT_CONFIG, jammu_airgradient_token, "JAMMU_AIRGRADIENT_TOKEN")
+}
+
+async def get_client() -> httpx.AsyncClient:
+    # one pooled client for every fetcher, so connections survive across refreshes.
+    # httpx sends Accept-Encoding gzip/deflate by default, plus br once brotli is installed
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            timeout=20,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100, keepalive_expiry=300),
+            http2=True # concurrent zone refreshes to the same host share one connection
+        )
+    return _CLIENT
+
+async def close_client() -> None:
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
+async def close_shared_cache() -> None:
+    if _REDIS is not None:
+        await _REDIS.aclose()
+
+async def _read_shared_cache(zone_id: str) -> Optional[Dict[str, Any]]:
+    if _REDIS is None:
+        return None
+    try:
+        raw = await _REDIS.get(f"{_SHARED_KEY_PREFIX}{zone_id}")
+        payload = orjson.loads(raw) if raw is not None else None
+    except Exception as e:
+        print(f"Redis read failed for {zone_id}: {e}")
+        return None
+    # anything that isn't one of our payloads counts as a miss
+    if not isinstance(payload, dict) or not isinstance(payload.get("expires_unix"), (int, float)):
+        return None
+    return payload
+
+async def _write_shared_cache(zone_id: str, payload: Dict[str, Any], current_time: float) -> None:
+    if _REDIS is None:
+        return
+    ttl = max(1, int(payload["expires_unix"] - current_time))
+    try:
+        await _REDIS.set(f"{_SHARED_KEY_PREFIX}{zone_id}", orjson.dumps(payload), ex=ttl)
+    except Exception as e:
+        print(f"Redis write failed for {zone_id}: {e}")
+
+def _closest_index(times: List[float], target: float) -> int:
+    # openmeteo returns hourly timestamps in ascending order
+    i = bisect_left(times, target)
+    if i == 0:
+        return 0
+    if i == len(times):
+        return i - 1
+    return i if times[i] - target < target - times[i - 1] else i - 1
+
+def _interpolate_gaps(times: List[float], vals: List[Optional[float]]) -> None:
+    # fills None runs between two known values in place, weighted by timestamp
+    prev = None
+    for i, v in enumerate(vals):
+        if v is None:
+            continue
+        if prev is not None and i - prev > 1:
+            t1, v1, t2 = times[prev], vals[prev], times[i]
+            for j in range(prev + 1, i):
+                fraction = (times[j] - t1) / (t2 - t1)
+                vals[j] = v1 + (v - v1) * fraction
+        prev = i
+
+def _get_merged_history(om_points: List[Dict[str, Any]], local_data: Dict[str, List[float]], now: float) -> List[Dict[str, Any]]:
+
+    # floor to the local hour with int math; offsets like IST's +5:30 shift the hour grid
+    utc_offset = time.localtime(now).tm_gmtoff
+    sensor_hours = {}
+    for ts, pm2_5, pm10 in zip(local_data["ts"], local_data["pm2_5"], local_data["pm10"]):
+        t = int(ts)
+        hour_ts = t - (t + utc_offset) % 3600
+        sensor_hours[hour_ts] = (pm2_5, pm10)
+
+    # one row per hour, one column per pollutant
+    times = sorted({pt["ts"] for pt in om_points} | sensor_hours.keys())
+    row_of = {ts: i for i, ts in enumerate(times)}
+    columns = {param: [None] * len(times) for param in _HISTORY_PARAMS}
+
+    # sensor PM data takes priority over estimated PM data
+    skip = ("pm2_5", "pm10") if sensor_hours else ()
     for pt in om_points:
-        ts = pt['ts']
-        if ts not in history_buckets: history_buckets[ts] = {}
-        history_buckets[ts][pt['param']] = pt['val']
-
-    if local_data:
-        # clear estimated PM data to prioritize sensor data
-        for ts in history_buckets:
-            history_buckets[ts].pop("pm2_5", None)
-            history_buckets[ts].pop("pm10", None)
-
-        for pt in local_data:
-            dt = datetime.fromtimestamp(pt["ts"])
-            hour_ts = dt.replace(minute=0, second=0, microsecond=0).timestamp()
-            
-            if hour_ts not in history_buckets: history_buckets[hour_ts] = {}
+        col = columns.get(pt["param"])
+        if col is not None and pt["param"] not in skip:
+            col[row_of[pt["ts"]]] = pt["val"]
 
-            history_buckets[hour_ts]["pm2_5"] = pt["pm2_5"]
-            history_buckets[hour_ts]["pm10"] = pt["pm10"]
+    if sensor_hours:
+        for hour_ts, (pm2_5, pm10) in sensor_hours.items():
+            i = row_of[hour_ts]
+            columns["pm2_5"][i] = pm2_5
+            columns["pm10"][i] = pm10
 
-        sorted_times = sorted(history_buckets.keys())
-        
         # linear interpolation for gaps
         for param in ["pm2_5", "pm10"]:
-            known = [(t, history_buckets[t][param]) for t in sorted_times if param in history_buckets[t]]
-            
-            if len(known) > 1:
-                for i in range(len(known) - 1):
-                    t1, v1 = known[i]
-                    t2, v2 = known[i+1]
-
-                    for ts in sorted_times:
-                        if t1 < ts < t2:
-                            fraction = (ts - t1) / (t2 - t1)
-                            val = v1 + (v2 - v1) * fraction
-                            history_buckets[ts][param] = val
-
-    sorted_times = sorted(history_buckets.keys())
-    now_ts = datetime.now().timestamp()
-    start_ts = now_ts - (24 * 3600)
-    
-    final_history = []
-    
-    for ts in sorted_times:
-        if ts < start_ts or ts > now_ts:
-            continue 
-            
-        hour_comps = history_buckets[ts]
-        try:
-            aqi_res = calculate_overall_aqi(hour_comps, zone_type="urban")
-            final_history.append({
-                "ts": int(ts),
-                "aqi": aqi_res["aqi"]
-            })
-        except:
-            continue
-            
-    return final_history
+            _interpolate_gaps(times, columns[param])
 
-async def fetch_airgradient_srinagar(lat: float, lon: float, zone_type: str = "hills") -> Dict[str, Any]:
-    if not airgradient_token:
-        print("WARNING: AIRGRADIENT_TOKEN not set.")
-        raise HTTPException(status_code=500, detail="Server config error: Missing AirGradient Token")
+    start_ts = now - (24 * 3600)
 
-    loc_id = SRINAGAR_AIRGRADIENT_CONFIG["location_id"]
-    
-    # OpenMeteo Params
-    om_url = "https://air-quality-api.open-meteo.com/v1/air-quality"
-    om_params = {
+    window = [i for i, ts in enumerate(times) if start_ts <= ts <= now]
+    aqi_vals = calculate_overall_aqi_batch({
+        param: [col[i] for i in window] for param, col in columns.items()
+    })
+
+    return [
+        {"ts": int(times[i]), "aqi": aqi}
+        for i, aqi in zip(window, aqi_vals) if aqi is not None
+    ]
+
+async def _hedged_get(client: httpx.AsyncClient, url: str, params: Dict[str, Any]) -> httpx.Response:
+    # GETs are idempotent, so a slow one can be raced by a second copy; whichever answers first wins
+    tasks = {asyncio.create_task(client.get(url, params=params))}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=OM_HEDGE_AFTER)
+        if not done:
+            tasks.add(asyncio.create_task(client.get(url, params=params)))
+        while True:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            # look at every finished copy, so a failure alongside a success is still retrieved
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded:
+                return succeeded[0].result()
+            if not tasks:
+                return done.pop().result() # both failed, re-raise the last error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _fetch_openmeteo(lat: float, lon: float, hourly_vars: str) -> Optional[Dict[str, Any]]:
+    # returns the parsed response, or None on a non-200
+    params = {
         "latitude": lat,
         "longitude": lon,
-        "hourly": "ozone,nitrogen_dioxide,sulphur_dioxide,carbon_monoxide",
+        "hourly": hourly_vars,
         "timezone": "auto",
         "timeformat": "unixtime",
         "past_days": 1
     }
+    client = await get_client()
+    r = await _hedged_get(client, _OM_URL, params)
+    if r.status_code != 200:
+        return None
+    return orjson.loads(r.content)
+
+async def _fetch_openmeteo_gases(lat: float, lon: float, now: float) -> Optional[Dict[str, Any]]:
+    # the hourly gas series only changes once an hour, so sensor zones reuse it across refreshes
+    hour_bucket = int(now // 3600)
+    cached = _OM_GASES_CACHE.get((lat, lon))
+    if cached and cached[0] == hour_bucket:
+        return cached[1]
+
+    data = await _fetch_openmeteo(lat, lon, "ozone,nitrogen_dioxide,sulphur_dioxide,carbon_monoxide")
+    if data is None:
+        return None
+
+    hourly = data.get("hourly", {})
+    _OM_GASES_CACHE[(lat, lon)] = (hour_bucket, hourly)
+    return hourly
+
+def _corrected(d: Dict[str, Any], key: str) -> Any:
+    # AirGradient sends calibrated readings as <key>_corrected when it has them
+    val = d.get(f"{key}_corrected")
+    return val if val is not None else d.get(key)
+
+async def fetch_airgradient(zone_id: str, lat: float, lon: float, now: float) -> Dict[str, Any]:
+    ag_config, token, token_env = _AIRGRADIENT_ZONES[zone_id]
+    if not token:
+        print(f"WARNING: {token_env} not set.")
+        # the env var name stays in the server log, clients get a generic message
+        raise HTTPException(status_code=500, detail="Server config error: Missing AirGradient Token")
+
+    loc_id = ag_config["location_id"]
 
     # Fetch Data
-    async with httpx.AsyncClient(timeout=20) as client:
-        ag_url = f"https://api.airgradient.com/public/api/v1/locations/{loc_id}/measures/current?token={airgradient_token}"
-        ag_task = client.get(ag_url)
-        om_task = client.get(om_url, params=om_params)
-        all_results = await asyncio.gather(ag_task, om_task)
+    client = await get_client()
+    ag_url = f"https://api.airgradient.com/public/api/v1/locations/{loc_id}/measures/current"
+    ag_task = client.get(ag_url, params={"token": token})
+    om_task = _fetch_openmeteo_gases(lat, lon, now)
+    all_results = await asyncio.gather(ag_task, om_task)
 
     ag_resp = all_results[0]
-    om_resp = all_results[1]
+    hourly = all_results[1]
     
     current_comps = {}
 
     if ag_resp.status_code == 200:
-        d = ag_resp.json()
-        pm25 = d.get("pm02_corrected") if d.get("pm02_corrected") is not None else d.get("pm02")
-        pm10 = d.get("pm10_corrected") if d.get("pm10_corrected") is not None else d.get("pm10")
+        d = orjson.loads(ag_resp.content)
+        pm25 = _corrected(d, "pm02")
+        pm10 = _corrected(d, "pm10")
         
         current_comps["pm2_5"] = pm25
         current_comps["pm10"] = pm10
-        current_comps["temp"] = d.get("atmp_corrected") if d.get("atmp_corrected") is not None else d.get("atmp")
-        current_comps["humidity"] = d.get("rhum_corrected") if d.get("rhum_corrected") is not None else d.get("rhum")
+        current_comps["temp"] = _corrected(d, "atmp")
+        current_comps["humidity"] = _corrected(d, "rhum")
         
         # Save to DB if valid
         if pm25 is not None and pm10 is not None:
-            database.save_reading("srinagar", float(pm25), float(pm10))
+            await asyncio.to_thread(database.save_reading, zone_id, float(pm25), float(pm10))
     else:
         print(f"AirGradient Error: {ag_resp.text}")
         raise HTTPException(status_code=502, detail="AirGradient fetch failed")
 
     om_points = []
-    if om_resp.status_code == 200:
-        om_json = om_resp.json()
-        hourly = om_json.get("hourly", {})
+    if hourly is not None:
         times = hourly.get("time", [])
         
-        o3_vals = hourly.get("ozone", [])
-        no2_vals = hourly.get("nitrogen_dioxide", [])
-        so2_vals = hourly.get("sulphur_dioxide", [])
-        co_vals = hourly.get("carbon_monoxide", [])
-        
+        param_series = {
+            "o3": hourly.get("ozone", []),
+            "no2": hourly.get("nitrogen_dioxide", []),
+            "so2": hourly.get("sulphur_dioxide", []),
+            "co": hourly.get("carbon_monoxide", [])
+        }
+
         # Build history points
-        for i, t in enumerate(times):
-            for param in ["o3", "no2", "so2", "co"]:
-                match param:
-                    case "o3":  vals = o3_vals
-                    case "no2": vals = no2_vals
-                    case "so2": vals = so2_vals
-                    case "co":  vals = co_vals
-                    case _:     vals = []
-
-                if i < len(vals) and vals[i] is not None:
-                    om_points.append({"ts": t, "param": param, "val": vals[i]})
+        for param, vals in param_series.items():
+            for t, v in zip(times, vals):
+                if v is not None:
+                    om_points.append({"ts": t, "param": param, "val": v})
 
         if times:
-            now_ts = datetime.now().timestamp()
-            closest_ts = min(times, key=lambda t: abs(t - now_ts))
-            idx = times.index(closest_ts)
-            
-            for param in ["o3", "no2", "so2", "co"]:
-                match param:
-                    case "o3":  vals = o3_vals
-                    case "no2": vals = no2_vals
-                    case "so2": vals = so2_vals
-                    case "co":  vals = co_vals
-                    case _:     vals = []
-
-                found_val = None
-                for step in range(0, 6):
-                    check_idx = idx - step
-                    if 0 <= check_idx < len(vals) and vals[check_idx] is not None:
-                        found_val = vals[check_idx]
+            idx = _closest_index(times, now)
+
+            # latest non-null value within the last 6 hours
+            for param, vals in param_series.items():
+                for check_idx in range(min(idx, len(vals) - 1), max(idx - 6, -1), -1):
+                    if vals[check_idx] is not None:
+                        current_comps[param] = vals[check_idx]
                         break
-                
-                if found_val is not None:
-                    current_comps[param] = found_val
 
     current_comps = {k: v for k, v in current_comps.items() if v is not None}
 
     if "pm2_5" not in current_comps:
-        db_history = database.get_history("srinagar", hours=2)
-        if db_history:
-            last_pt = db_history[-1]
+        last_pt = await asyncio.to_thread(database.get_latest_reading, zone_id, 2)
+        if last_pt:
             current_comps["pm2_5"] = last_pt["pm2_5"]
             current_comps["pm10"] = last_pt["pm10"]
 
-    history = _get_merged_history("srinagar", om_points)
+    # sqlite calls are blocking, so they run off the event loop
+    local_data = await asyncio.to_thread(database.get_history, zone_id, 24)
+    history = _get_merged_history(om_points, local_data, now)
 
     return {
         "current_comps": current_comps,
         "history": history 
     }
 
-async def fetch_airgradient_jammu(lat: float, lon: float, zone_type: str = "urban") -> Dict[str, Any]:
-    if not jammu_airgradient_token:
-        print("WARNING: JAMMU_AIRGRADIENT_TOKEN not set.")
-        raise HTTPException(status_code=500, detail="Server config error: Missing Jammu AirGradient Token")
+async def fetch_openmeteo_live(lat: float, lon: float, zone_type: str, now: float) -> Dict[str, Any]:
+    data = await _fetch_openmeteo(lat, lon, "pm10,pm2_5,nitrogen_dioxide,sulphur_dioxide,carbon_monoxide,ozone")
+    if data is None:
+        raise HTTPException(status_code=502, detail="openmeteo request failed")
 
-    loc_id = JAMMU_AIRGRADIENT_CONFIG["location_id"]
-
-    # OpenMeteo Params
-    om_url = "https://air-quality-api.open-meteo.com/v1/air-quality"
-    om_params = {
-        "latitude": lat,
-        "longitude": lon,
-        "hourly": "ozone,nitrogen_dioxide,sulphur_dioxide,carbon_monoxide",
-        "timezone": "auto",
-        "timeformat": "unixtime",
-        "past_days": 1
-    }
-
-    # Fetch Data
-    async with httpx.AsyncClient(timeout=20) as client:
-        ag_url = f"https://api.airgradient.com/public/api/v1/locations/{loc_id}/measures/current?token={jammu_airgradient_token}"
-        ag_task = client.get(ag_url)
-        om_task = client.get(om_url, params=om_params)
-        all_results = await asyncio.gather(ag_task, om_task)
-
-    ag_resp = all_results[0]
-    om_resp = all_results[1]
-    
-    current_comps = {}
-
-    if ag_resp.status_code == 200:
-        d = ag_resp.json()
-        pm25 = d.get("pm02_corrected") if d.get("pm02_corrected") is not None else d.get("pm02")
-        pm10 = d.get("pm10_corrected") if d.get("pm10_corrected") is not None else d.get("pm10")
-        
-        current_comps["pm2_5"] = pm25
-        current_comps["pm10"] = pm10
-        current_comps["temp"] = d.get("atmp_corrected") if d.get("atmp_corrected") is not None else d.get("atmp")
-        current_comps["humidity"] = d.get("rhum_corrected") if d.get("rhum_corrected") is not None else d.get("rhum")
+    hourly = data.get("hourly", {})
+    times = hourly.get("time", [])
 
-        # Save to DB if valid
-        if pm25 is not None and pm10 is not None:
-            database.save_reading("jammu_city", float(pm25), float(pm10))
-    else:
-        print(f"AirGradient Error: {ag_resp.text}")
-        raise HTTPException(status_code=502, detail="AirGradient fetch failed")
+    if not times:
+        raise HTTPException(status_code=404, detail="no openmeteo aq data found")
 
-    om_points = []
-    if om_resp.status_code == 200:
-        om_json = om_resp.json()
-        hourly = om_json.get("hourly", {})
-        times = hourly.get("time", [])
-        
-        o3_vals = hourly.get("ozone", [])
-        no2_vals = hourly.get("nitrogen_dioxide", [])
-        so2_vals = hourly.get("sulphur_dioxide", [])
-        co_vals = hourly.get("carbon_monoxide", [])
-        
-        # Build history points
-        for i, t in enumerate(times):
-            for param in ["o3", "no2", "so2", "co"]:
-                match param:
-                    case "o3":  vals = o3_vals
-                    case "no2": vals = no2_vals
-                    case "so2": vals = so2_vals
-                    case "co":  vals = co_vals
-                    case _:     vals = []
-
-                if i < len(vals) and vals[i] is not None:
-                    om_points.append({"ts": t, "param": param, "val": vals[i]})
+    target_idx = _closest_index(times, now)
 
-        if times:
-            now_ts = datetime.now().timestamp()
-            closest_ts = min(times, key=lambda t: abs(t - now_ts))
-            idx = times.index(closest_ts)
-            
-            for param in ["o3", "no2", "so2", "co"]:
-                match param:
-                    case "o3":  vals = o3_vals
-                    case "no2": vals = no2_vals
-                    case "so2": vals = so2_vals
-                    case "co":  vals = co_vals
-                    case _:     vals = []
-
-                found_val = None
-                for step in range(0, 6):
-                    check_idx = idx - step
-                    if 0 <= check_idx < len(vals) and vals[check_idx] is not None:
-                        found_val = vals[check_idx]
-                        break
-                
-                if found_val is not None:
-                    current_comps[param] = found_val
+    # bind each pollutant series once instead of re-looking it up per hour
+    series = {
+        "pm10": hourly.get("pm10", []),
+        "pm2_5": hourly.get("pm2_5", []),
+        "no2": hourly.get("nitrogen_dioxide", []),
+        "so2": hourly.get("sulphur_dioxide", []),
+        "co": hourly.get("carbon_monoxide", []),
+        "o3": hourly.get("ozone", [])
+    }
 
-    current_comps = {k: v for k, v in current_comps.items() if v is not None}
+    current_comps = {
+        k: vals[target_idx] for k, vals in series.items()
+        if target_idx < len(vals) and vals[target_idx] is not None
+    }
 
-    if "pm2_5" not in current_comps:
-        db_history = database.get_history("jammu_city", hours=2)
-        if db_history:
-            last_pt = db_history[-1]
-            current_comps["pm2_5"] = last_pt["pm2_5"]
-            current_comps["pm10"] = last_pt["pm10"]
+    # times are ascending, so the last 24h is one contiguous slice
+    lo = bisect_left(times, now - (24 * 3600))
+    hi = bisect_right(times, now)
+    aqi_vals = calculate_overall_aqi_batch({k: vals[lo:hi] for k, vals in series.items()})
 
-    history = _get_merged_history("jammu_city", om_points)
+    history = [
+        {"ts": t, "aqi": aqi}
+        for t, aqi in zip(times[lo:hi], aqi_vals) if aqi is not None
+    ]
 
     return {
         "current_comps": current_comps,
-        "history": history 
-    }
-
-async def fetch_openmeteo_live(lat: float, lon: float, zone_type: str) -> Dict[str, Any]:
-    url = "https://air-quality-api.open-meteo.com/v1/air-quality"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "hourly": "pm10,pm2_5,nitrogen_dioxide,sulphur_dioxide,carbon_monoxide,ozone",
-        "timezone": "auto",
-        "timeformat": "unixtime",
-        "past_days": 1
+        "history": history,
+        "data_ts": times[target_idx]
     }
 
-    async with httpx.AsyncClient(timeout=20) as client:
-        r = await client.get(url, params=params)
-        if r.status_code != 200:
-            raise HTTPException(status_code=502, detail="openmeteo request failed")
-
-        data = r.json()
-        hourly = data.get("hourly", {})
-        times = hourly.get("time", [])
-
-        if not times:
-            raise HTTPException(status_code=404, detail="no openmeteo aq data found")
-
-        now_ts = datetime.now().timestamp()
-        closest_ts = min(times, key=lambda t: abs(t - now_ts))
-        target_idx = times.index(closest_ts)
-
-        current_comps = {
-            "pm10": hourly.get("pm10", [])[target_idx],
-            "pm2_5": hourly.get("pm2_5", [])[target_idx],
-            "no2": hourly.get("nitrogen_dioxide", [])[target_idx],
-            "so2": hourly.get("sulphur_dioxide", [])[target_idx],
-            "co": hourly.get("carbon_monoxide", [])[target_idx],
-            "o3": hourly.get("ozone", [])[target_idx]
-        }
-
-        current_comps = {k: v for k, v in current_comps.items() if v is not None}
-
-        start_ts = now_ts - (24 * 3600)
-        history = []
-
-        for i, t in enumerate(times):
-            if t < start_ts or t > now_ts:
-                continue
-
-            hour_comps = {
-                "pm10": hourly.get("pm10", [])[i],
-                "pm2_5": hourly.get("pm2_5", [])[i],
-                "no2": hourly.get("nitrogen_dioxide", [])[i],
-                "so2": hourly.get("sulphur_dioxide", [])[i],
-                "co": hourly.get("carbon_monoxide", [])[i],
-                "o3": hourly.get("ozone", [])[i]
-            }
-            hour_comps = {k: v for k, v in hour_comps.items() if v is not None}
-            
-            try:
-                aqi_res = calculate_overall_aqi(hour_comps, zone_type=zone_type)
-                history.append({
-                    "ts": times[i],
-                    "aqi": aqi_res["aqi"]
-                })
-            except:
-                continue
-
-        return {
-            "current_comps": current_comps,
-            "history": history
-        }
+def _cache_expiry(data_ts: Optional[float], current_time: float, ttl: Optional[float] = None) -> float:
+    if ttl is not None:
+        # zones.json can pin a zone to its provider's own update cadence
+        expiry = current_time + ttl
+    elif data_ts is None:
+        # live sensor zones have no upstream cadence to follow
+        expiry = current_time + CACHE_DURATION
+    else:
+        # the nearest hourly sample changes half an hour after data_ts
+        expiry = max(data_ts + 1800, current_time + MIN_CACHE_DURATION)
+    return expiry + random.uniform(-CACHE_JITTER, CACHE_JITTER)
 
 async def get_zone_data(zone_id: str, zone_name: str, lat: float, lon: float, zone_type: str, force_refresh: bool = False):
-    cached_data = _RAM_CACHE.get(zone_id)
-    current_time = datetime.now().timestamp()
-
-    if cached_data and not force_refresh:
-        last_fetched = cached_data.get("timestamp_unix", 0)
-        if current_time - last_fetched < CACHE_DURATION:
+    if not force_refresh:
+        cached_data = _RAM_CACHE.get(zone_id)
+        if cached_data:
             return cached_data
 
+    # concurrent misses for the same zone share one upstream fetch
+    task = _INFLIGHT.get(zone_id)
+    if task is None:
+        task = asyncio.create_task(_refresh_zone_data(zone_id, zone_name, lat, lon, zone_type))
+        _INFLIGHT[zone_id] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(zone_id, None))
+
+    # stale-while-revalidate: answer from the expired payload, the refresh (and any Redis
+    # round-trip) lands for the next caller
+    stale = _STALE_CACHE.get(zone_id)
+    if stale is not None and not force_refresh:
+        return stale
+
+    # shield so a cancelled caller doesn't cancel the fetch for everyone else
+    return await asyncio.shield(task)
+
+async def _refresh_zone_data(zone_id: str, zone_name: str, lat: float, lon: float, zone_type: str):
+    # another worker may already have refreshed this zone
+    shared = await _read_shared_cache(zone_id)
+    if shared is not None and time.time() < shared.get("expires_unix", 0):
+        _RAM_CACHE[zone_id] = shared
+        _STALE_CACHE[zone_id] = shared
+        return shared
+
+    # one clock reading per refresh, so every fetcher and the payload agree on "now"
+    current_time = time.time()
+
     try:
-        if zone_id == "srinagar":
-            fetched_data = await fetch_airgradient_srinagar(lat, lon, zone_type=zone_type)
-            source_name = "airgradient + openmeteo"
-        elif zone_id == "jammu_city":
-            fetched_data = await fetch_airgradient_jammu(lat, lon, zone_type=zone_type)
+        if zone_id in _AIRGRADIENT_ZONES:
+            fetched_data = await fetch_airgradient(zone_id, lat, lon, current_time)
             source_name = "airgradient + openmeteo"
         else:
-            fetched_data = await fetch_openmeteo_live(lat, lon, zone_type)
+            fetched_data = await fetch_openmeteo_live(lat, lon, zone_type, current_time)
             source_name = "openmeteo air pollution api"
         
         raw_comps = fetched_data["current_comps"]
@@ -393,18 +401,20 @@ async def get_zone_data(zone_id: str, zone_name: str, lat: float, lon: float, zo
         trend_1h = None
         trend_24h = None
         
-        def get_past_aqi(target_ts, history_list, tolerance=1800):
-            for point in history_list:
-                if abs(point['ts'] - target_ts) <= tolerance:
-                    return point['aqi']
+        def get_past_aqi(target_ts, history_ts, tolerance=1800):
+            # history is sorted by ts, so the nearest point is found by bisection
+            i = _closest_index(history_ts, target_ts)
+            if abs(history_ts[i] - target_ts) <= tolerance:
+                return history[i]['aqi']
             return None
 
         if history:
             ts_1h_ago = current_time - 3600
             ts_24h_ago = current_time - 86400
+            history_ts = [point['ts'] for point in history]
 
-            val_1h = get_past_aqi(ts_1h_ago, history)
-            val_24h = get_past_aqi(ts_24h_ago, history)
+            val_1h = get_past_aqi(ts_1h_ago, history_ts)
+            val_24h = get_past_aqi(ts_24h_ago, history_ts)
 
             if val_1h is not None:
                 trend_1h = current_aqi - val_1h
@@ -417,6 +427,7 @@ async def get_zone_data(zone_id: str, zone_name: str, lat: float, lon: float, zo
             "zone_name": zone_name,
             "source": source_name,
             "timestamp_unix": current_time,
+            "expires_unix": _cache_expiry(fetched_data.get("data_ts"), current_time, ZONES.get(zone_id, {}).get("ttl")),
             "coordinates": {"lat": lat, "lon": lon},
             "history": history,
             "trends": {
@@ -427,28 +438,50 @@ async def get_zone_data(zone_id: str, zone_name: str, lat: float, lon: float, zo
         }
 
         _RAM_CACHE[zone_id] = full_payload
+        _STALE_CACHE[zone_id] = full_payload
+        await _write_shared_cache(zone_id, full_payload, current_time)
         return full_payload
         
     except Exception as e:
         print(f"Live fetch failed for {zone_id}: {e}")
+        cached_data = _STALE_CACHE.get(zone_id)
         if cached_data:
             return cached_data
         raise e
 
-async def update_all_zones_background():
-    print(f"--- Updating Zones at {datetime.now()} ---")
-    for zone_id, z in ZONES.items():
-        try:
-            await get_zone_data(
-                z["id"], 
-                z["name"], 
-                z["lat"], 
-                z["lon"], 
-                z.get("zone_type", "hills"),
-                force_refresh=True 
-            )
-            print(f"Updated: {zone_id}")
-            await asyncio.sleep(1) 
-        except Exception as e:
-            print(f"Failed to update {zone_id}: {e}")
-    print("--- Update Cycle Complete ---")
\ No newline at end of file
+async def run_zone_schedulers():
+    # every zone runs on its own schedule, refreshing again as soon as its payload expires
+    sem = asyncio.Semaphore(update_concurrency)
+
+    async def _zone_loop(zone_id: str, z: Dict[str, Any]):
+        await asyncio.sleep(random.uniform(0, ZONE_START_SPREAD))
+        while True:
+            fresh = _RAM_CACHE.get(zone_id)
+            if fresh is not None:
+                # a request-triggered refresh already landed while we slept; wait for its expiry instead
+                delay = fresh["expires_unix"] - time.time()
+            else:
+                async with sem:
+                    try:
+                        payload = await get_zone_data(
+                            z["id"], 
+                            z["name"], 
+                            z["lat"], 
+                            z["lon"], 
+                            z.get("zone_type", "hills"),
+                            force_refresh=True 
+                        )
+                        delay = payload["expires_unix"] - time.time()
+                        print(f"Updated: {zone_id}")
+                    except Exception as e:
+                        print(f"Failed to update {zone_id}: {e}")
+                        delay = 0
+                # floor so a failing zone (stale or no payload back) doesn't spin
+                delay = max(MIN_CACHE_DURATION, delay)
+
+            # wake a random moment after expiry: with several workers sharing Redis, the first one
+            # awake refreshes and the rest pick up its payload; failing zones don't retry in lockstep
+            await asyncio.sleep(delay + random.uniform(0, CACHE_JITTER))
+
+    print(f"--- Starting zone updates at {datetime.now()} ---")
+    await asyncio.gather(*[_zone_loop(zone_id, z) for zone_id, z in ZONES.items()])
\ No newline at end of file
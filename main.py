@@ -1,29 +1,33 @@
 import asyncio
+import orjson
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from routes import register_zone_routes
-from fetchers import update_all_zones_background
+from fetchers import run_zone_schedulers, close_client, close_shared_cache
+
+def _log_scheduler_exit(task: asyncio.Task) -> None:
+    # the schedulers should only ever stop by cancellation at shutdown
+    if not task.cancelled() and task.exception() is not None:
+        print(f"CRITICAL: Background loop error: {task.exception()}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    task = asyncio.create_task(periodic_updates())
+    # runs for the life of the app; each zone reschedules itself when its data expires
+    task = asyncio.create_task(run_zone_schedulers())
+    task.add_done_callback(_log_scheduler_exit)
     yield
     task.cancel()
+    await close_client()
+    await close_shared_cache()
 
-async def periodic_updates():
-    while True:
-        try:
-            await update_all_zones_background()
-        except asyncio.CancelledError:
-            break
-        except Exception as e:
-            print(f"CRITICAL: Background loop error: {e}")
-        
-        # Wait 15 minutes
-        await asyncio.sleep(900)
+class ORJSONResponse(JSONResponse):
+    # fastapi's own ORJSONResponse is deprecated in newer releases, this is the same thing
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
 
-app = FastAPI(title="breathe backend", lifespan=lifespan)
+app = FastAPI(title="breathe backend", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,4 +37,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-register_zone_routes(app)
\ No newline at end of file
+register_zone_routes(app)
+
+if __name__ == "__main__":
+    # `python main.py` for production: uvloop when it's installed, several workers via WEB_CONCURRENCY
+    import os
+    import uvicorn
+    try:
+        import uvloop # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        loop=loop,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1"))
+    )
\ No newline at end of file
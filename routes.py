@@ -1,55 +1,56 @@
-from fastapi import FastAPI, HTTPException
-from typing import Callable, Any, Dict
+import asyncio
+import orjson
+from fastapi import FastAPI, HTTPException, Response
+from typing import Dict, Tuple
 
 from config import ZONES
 from fetchers import get_zone_data
 
-def register_zone_routes(app: FastAPI) -> None:
-    def _make_zone_handler(z: Dict[str, Any]) -> Callable[[], Any]:
-        z_type = z.get("zone_type", "hills") 
+# zones.json doesn't change while the app runs, so /zones is encoded once
+_ZONES_BYTES = orjson.dumps({
+    "zones": [
+        {
+            "id": z["id"],
+            "name": z["name"],
+            "provider": z.get("provider"),
+            "lat": z.get("lat"),
+            "lon": z.get("lon"),
+            "zone_type": z.get("zone_type", "hills")
+        }
+        for z in ZONES.values()
+    ]
+})
 
-        async def _handler():
-            return await get_zone_data(
-                z["id"], 
-                z["name"], 
-                z["lat"], 
-                z["lon"],
-                z_type
-            )
-        return _handler
+# get_zone_data arguments per zone, unpacked once instead of on every request
+_ZONE_TUPLES: Dict[str, Tuple[str, str, float, float, str]] = {
+    zid: (z["id"], z["name"], z["lat"], z["lon"], z.get("zone_type", "hills"))
+    for zid, z in ZONES.items()
+}
 
-    for zid, z in ZONES.items():
-        path = f"/aqi/{zid}"
-        handler = _make_zone_handler(z)
-        app.get(path)(handler)
+def register_zone_routes(app: FastAPI) -> None:
+    @app.get("/aqi/all")
+    async def get_all_zones_aqi():
+        # zones are fetched concurrently, so a cold start costs the slowest zone, not the sum
+        results = await asyncio.gather(
+            *[get_zone_data(*args) for args in _ZONE_TUPLES.values()],
+            return_exceptions=True
+        )
+        return {
+            "zones": [
+                r if not isinstance(r, Exception) else {"zone_id": zid, "error": str(r)}
+                for zid, r in zip(_ZONE_TUPLES, results)
+            ]
+        }
 
+    # one parameterized route serves every zone; /aqi/all above is matched first
+    @app.get("/aqi/{zone_id}")
     @app.get("/aqi/zone/{zone_id}")
     async def get_zone_aqi(zone_id: str):
-        if zone_id not in ZONES:
+        args = _ZONE_TUPLES.get(zone_id)
+        if args is None:
             raise HTTPException(status_code=404, detail="zone not found")
-        z = ZONES[zone_id]
-        z_type = z.get("zone_type", "hills")
-
-        return await get_zone_data(
-            z["id"], 
-            z["name"], 
-            z["lat"], 
-            z["lon"], 
-            z_type
-        )
+        return await get_zone_data(*args)
 
     @app.get("/zones")
-    async def list_zones() -> dict:
-        return {
-            "zones": [
-                {
-                    "id": z["id"],
-                    "name": z["name"],
-                    "provider": z.get("provider"),
-                    "lat": z.get("lat"),
-                    "lon": z.get("lon"),
-                    "zone_type": z.get("zone_type", "hills")
-                }
-                for z in ZONES.values()
-            ]
-        }
\ No newline at end of file
+    async def list_zones() -> Response:
+        return Response(content=_ZONES_BYTES, media_type="application/json")
\ No newline at end of file